@@ -5,135 +5,224 @@ Gradio Web App for Excel Data Extraction and Visualization
 
 import gradio as gr
 import pandas as pd
-import subprocess
 import os
-import json
 import tempfile
 from pathlib import Path
+from collections import OrderedDict
 from typing import List, Dict, Any
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-import re
+import threading
+import functools
+import hashlib
+from uuid import uuid4
+from eparse.core import df_serialize_table, get_df_from_file
+from eparse.interfaces import DATABASE, ExcelParse, i_factory
 
-def extract_document_text(output: str) -> str:
-    lines = output.strip().split('\n')
-    doc_lines = []
-    for line in lines:
-        if 'table ' in line and 'found at' in line:
-            doc_lines.append(line)
-    # If no table lines found, show all output for debugging
-    return '\n'.join(doc_lines) if doc_lines else output.strip()
+# eparse binds its peewee models to one global database proxy
+_database_lock = threading.Lock()
+
+# SQLite caps bound variables per statement and eparse inserts a whole
+# table in one INSERT, so rows are written in batches of this size
+INSERT_BATCH_ROWS = 2000
+
+# Extraction results kept in memory; the least recently used go first
+CACHE_MAX_RESULTS = 32
+
+def _hash_file(file_path: str):
+    """Return a SHA-256 hash object for a file without reading it into one bytes object."""
+    with open(file_path, 'rb') as f:
+        # Python 3.11+ hashes straight from the file with a C buffer loop
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256")
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+        return digest
+
+def write_database(db_file: Path, rows: List[Dict[str, Any]]):
+    """Append serialized rows to a SQLite database using eparse's interface."""
+    for start in range(0, len(rows), INSERT_BATCH_ROWS):
+        with _database_lock:
+            try:
+                i_factory(f"sqlite3:///{db_file}", ExcelParse).output(rows[start:start + INSERT_BATCH_ROWS])
+            finally:
+                DATABASE.close()
+
+def cache_by_content(extract):
+    """Memoize an extraction method on a hash of the uploaded file's bytes."""
+    results = OrderedDict()
+    results_lock = threading.Lock()
+    
+    @functools.wraps(extract)
+    def wrapper(self, file_path: str) -> Dict[str, Any]:
+        # Results that point at a SQLite file are not reusable across uploads
+        if self.sqlite_sink:
+            return extract(self, file_path)
+        
+        try:
+            digest = _hash_file(file_path)
+        except OSError:
+            return extract(self, file_path)
+        # The file name is part of the output (f_name), so it is part of the
+        # key, as is whether the structured summary was built
+        digest.update(Path(file_path).name.encode())
+        digest.update(b"structured" if self.parse_structured else b"text")
+        
+        key = digest.hexdigest()
+        
+        with results_lock:
+            if key in results:
+                results.move_to_end(key)
+                return results[key]
+        
+        result = extract(self, file_path)
+        if "error" not in result:
+            with results_lock:
+                results[key] = result
+                while len(results) > CACHE_MAX_RESULTS:
+                    results.popitem(last=False)
+        return result
+    
+    return wrapper
 
 class ExcelExtractor:
     """Class to handle Excel file extraction using eparse."""
     
-    def __init__(self):
+    def __init__(self, sqlite_sink: bool = False, parse_structured: bool = True):
         self.temp_dir = Path(tempfile.mkdtemp())
         self.db_files = []
+        # Only write a SQLite database when the caller explicitly asks for one
+        self.sqlite_sink = sqlite_sink
+        # Text-only callers can skip building the sheets/columns summary
+        self.parse_structured = parse_structured
     
+    @cache_by_content
     def extract_from_excel(self, file_path: str) -> Dict[str, Any]:
-        """Extract data from Excel file using eparse."""
+        """Extract data from Excel file using eparse's in-process API."""
         try:
-            # Create .files directory for database storage
-            files_dir = self.temp_dir / ".files"
-            files_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Parse to SQLite database
-            db_file = files_dir / "mydb.db"
-            eparse_output = f"sqlite3:///{db_file}"
-            print("files_dir:", files_dir)
-            print("eparse_output:", eparse_output)
-            print("files_dir exists?", files_dir.exists())
-            print("files_dir is dir?", files_dir.is_dir())
-            print("files_dir writable?", os.access(files_dir, os.W_OK))
-            result = subprocess.run([
-                'eparse', '-f', file_path, '-o', eparse_output, 'parse', '-z'
-            ], capture_output=True, text=True, check=True)
-            
-            print("eparse stdout:", result.stdout)
-            print("eparse stderr:", result.stderr)
-            print("eparse returncode:", result.returncode)
-            
-            print("RAW EPARSE OUTPUT:")
-            print(result.stdout)
+            f_name = Path(file_path).name
+            db_file = self._new_database_path() if self.sqlite_sink else None
+            frames = []
+            doc_lines = []
             
-            # Find created database files
-            db_files = list(files_dir.glob('*.db'))
-            self.db_files = db_files
+            # Same table detection and serialization as `eparse parse -z`.
+            # Tables are handled as the generator yields them, so only one
+            # table's serialized rows are alive at a time.
+            tables = get_df_from_file(file_path)
+            while True:
+                try:
+                    table, excel_RC, name, sheet = next(tables)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    # Only a workbook eparse cannot read falls back to pandas;
+                    # a half-written database is not left behind
+                    if db_file is not None:
+                        db_file.unlink(missing_ok=True)
+                    try:
+                        return self._pandas_fallback_extract(file_path, reason=str(e))
+                    except Exception:
+                        return {"error": f"General error: {str(e)}"}
+                
+                doc_lines.append(f"{f_name} table {name} {table.shape} found at {excel_RC} in {sheet}")
+                rows = df_serialize_table(table, name=name, sheet=sheet, f_name=f_name)
+                if db_file is not None:
+                    try:
+                        write_database(db_file, rows)
+                    except Exception as e:
+                        db_file.unlink(missing_ok=True)
+                        return {"error": f"Database write error: {str(e)}"}
+                frames.append(pd.DataFrame(rows))
             
-            if not db_files:
-                return {"error": "No database files created"}
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            extraction_data = self._extract_from_dataframe(df)
+            extraction_data["document_text"] = '\n'.join(doc_lines)
             
-            # Extract data from database
-            extraction_data = self._extract_from_database(db_files[0])
-            # Add document text extraction from eparse output
-            extraction_data["document_text"] = extract_document_text(result.stdout)
-            
-            return {
+            result = {
                 "success": True,
                 "data": extraction_data,
-                "db_file": str(db_files[0]),
                 "message": "Data extracted successfully"
             }
             
-        except subprocess.CalledProcessError as e:
-            return {"error": f"eparse error: {e.stderr}"}
+            if db_file is not None:
+                if not frames:
+                    return {"error": "No database files created"}
+                self.db_files.append(db_file)
+                result["db_file"] = str(db_file)
+            
+            return result
+            
         except Exception as e:
             return {"error": f"General error: {str(e)}"}
     
-    def _extract_from_database(self, db_file: Path) -> Dict[str, Any]:
-        """Extract structured data from SQLite database and return both structured and plain text data."""
-        try:
-            # Query all data
-            result = subprocess.run([
-                'eparse', '-i', f'sqlite3:///{db_file}', '-o', 'stdout:///', 'query'
-            ], capture_output=True, text=True, check=True)
-            # Parse the output (assuming it's in a structured format)
-            data = self._parse_eparse_output(result.stdout)
-            # Add plain text version of all data for display
-            data["plain_text"] = result.stdout.strip()
-            return data
-        except subprocess.CalledProcessError as e:
-            return {"error": f"Database query error: {e.stderr}"}
+    def _pandas_fallback_extract(self, file_path: str, reason: str) -> Dict[str, Any]:
+        """Read every sheet with plain pandas when eparse cannot handle the file."""
+        # One ExcelFile opens the workbook once and shares it across sheets
+        with pd.ExcelFile(file_path) as xl:
+            frames = {name: xl.parse(name) for name in xl.sheet_names}
+        
+        columns = list(dict.fromkeys(str(col) for df in frames.values() for col in df.columns))
+        
+        extraction_data = {
+            "tables": [],
+            "sheets": list(frames),
+            "columns": columns,
+            "total_rows": sum(len(df) for df in frames.values()),
+            "plain_text": '\n\n'.join(f"{name}\n{df}" for name, df in frames.items()),
+            "document_text": ""
+        }
+        
+        return {
+            "success": True,
+            "data": extraction_data,
+            "message": f"eparse failed ({reason}); data extracted with pandas"
+        }
     
-    def _parse_eparse_output(self, output: str) -> Dict[str, Any]:
-        """Parse eparse output into structured data."""
-        lines = output.strip().split('\n')
+    def _new_database_path(self) -> Path:
+        """Return a fresh SQLite path so a shared extractor never mixes uploads."""
+        files_dir = self.temp_dir / ".files"
+        files_dir.mkdir(parents=True, exist_ok=True)
+        return files_dir / f"{uuid4()}.db"
+    
+    def _extract_from_dataframe(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Build structured and plain text data from serialized eparse rows."""
+        if not self.parse_structured:
+            # Same rendering `eparse query` prints to stdout
+            return {"plain_text": str(df)}
         
-        # Extract headers and data
         data = {
             "tables": [],
-            "sheets": set(),
-            "columns": set(),
-            "total_rows": 0
+            "sheets": [],
+            "columns": [],
+            "total_rows": len(df),
+            # Same rendering `eparse query` prints to stdout
+            "plain_text": str(df)
         }
         
-        # Simple parsing - in a real app you'd want more sophisticated parsing
-        for line in lines:
-            if line.strip() and not line.startswith('==='):
-                data["total_rows"] += 1
-                # Extract sheet and column info if available
-                if 'sheet:' in line:
-                    sheet_name = line.split('sheet:')[-1].split()[0]
-                    data["sheets"].add(sheet_name)
-                if 'c_header:' in line:
-                    col_name = line.split('c_header:')[-1].split()[0]
-                    data["columns"].add(col_name)
-        
-        data["sheets"] = list(data["sheets"])
-        data["columns"] = list(data["columns"])
+        if not df.empty:
+            data["sheets"] = df["sheet"].unique().tolist()
+            data["columns"] = df["c_header"].unique().tolist()
         
         return data
 
+# Single extractor shared by every request, created once at app startup
+_extractor = None
+_extractor_lock = threading.Lock()
+
+def get_extractor() -> ExcelExtractor:
+    """Return the shared ExcelExtractor, creating it on first use."""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            # This app only displays the plain text rendering
+            _extractor = ExcelExtractor(parse_structured=False)
+        return _extractor
+
 def process_excel_file(file) -> str:
     """Process uploaded Excel file and return all extracted data as plain text."""
     if file is None:
         return "Please upload an Excel file."
     try:
-        extractor = ExcelExtractor()
-        result = extractor.extract_from_excel(file.name)
+        result = get_extractor().extract_from_excel(file.name)
         if "error" in result:
             return f"Error: {result['error']}"
         # Show all extracted data as plain text
@@ -145,6 +234,9 @@ def process_excel_file(file) -> str:
 # Create Gradio interface
 def create_interface():
     """Create the Gradio interface (document text only, no sample file)."""
+    # Pay the extractor setup cost once, not on the first upload
+    get_extractor()
+    
     with gr.Blocks(title="Excel Data Extraction", theme=gr.themes.Soft()) as demo:
         gr.Markdown("# 📄 Excel Document Text Extraction Tool")
         gr.Markdown("Upload an Excel file to extract document text using eparse")
@@ -5,60 +5,115 @@ Enhanced Gradio: Better handle eparse output and more detailed data extraction
 
 import gradio as gr
 import pandas as pd
-import subprocess
 import os
+import atexit
+import shutil
+import threading
+import io
 import json
 import tempfile
 import sqlite3
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from typing import Dict, Any, Tuple
 import numpy as np
-import re
+import hashlib
+import functools
+import xlsxwriter
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from eparse.core import df_serialize_table, get_df_from_file
+# Writes go through app.py's helper so both apps share one lock around
+# eparse's global database proxy
+from app import write_database
+
+# excelparse fields shown in the sample table
+EXCELPARSE_FIELDS = ("sheet", "c_header", "r_header", "excel_RC", "type", "value")
+
+# Rows kept for the sample data table
+SAMPLE_ROWS = 10
+
+def _count_by(cursor: sqlite3.Cursor, column: str) -> Dict[str, int]:
+    """Row counts per non-empty value of an excelparse column, in first-seen order."""
+    cursor.execute(
+        f"SELECT {column}, COUNT(*) FROM excelparse "
+        f"WHERE {column} IS NOT NULL AND {column} != '' "
+        f"GROUP BY {column} ORDER BY MIN(rowid)"
+    )
+    return dict(cursor.fetchall())
+
+class _ErrorResult(Exception):
+    """Carries an error result past lru_cache, which never stores a call that raised."""
+    
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result["error"])
+        self.result = result
 
 class EnhancedExcelExtractor:
     """Enhanced class to handle Excel file extraction using eparse."""
     
     def __init__(self):
         self.temp_dir = Path(tempfile.mkdtemp())
-        self.db_files = []
+        atexit.register(shutil.rmtree, self.temp_dir, ignore_errors=True)
         self.extracted_data = {}
+        # Repeat uploads of an unchanged file reuse the previous result
+        self._extract_cached = functools.lru_cache(maxsize=16)(self._extract_or_raise)
     
     def extract_from_excel(self, file_path: str):
         """Extract data from Excel file using eparse with enhanced parsing."""
         try:
-            # Create .files directory for database storage
-            files_dir = self.temp_dir / ".files"
-            files_dir.mkdir(exist_ok=True)
-            
-            # Parse to SQLite database
-            result = subprocess.run([
-                'eparse', '-f', file_path, '-o', f'sqlite3:///{files_dir}', 'parse', '-z'
-            ], capture_output=True, text=True, check=True)
+            stat = os.stat(file_path)
+        except OSError as e:
+            return {"error": f"General error: {str(e)}"}
+        try:
+            return self._extract_cached(file_path, stat.st_mtime, stat.st_size)
+        except _ErrorResult as e:
+            return e.result
+    
+    def _extract_or_raise(self, file_path: str, mtime: float, size: int):
+        """Run _extract, raising errors so they are retried instead of cached."""
+        result = self._extract(file_path, mtime, size)
+        if "error" in result:
+            raise _ErrorResult(result)
+        return result
+    
+    def _extract(self, file_path: str, mtime: float, size: int):
+        """Run eparse on a file; mtime and size only serve as cache key."""
+        # Each extraction gets its own .files directory so a reused
+        # extractor never picks up another upload's database
+        files_dir = self.temp_dir / ".files" / uuid4().hex
+        try:
+            files_dir.mkdir(parents=True)
             
-            # Find created database files
-            db_files = list(files_dir.glob('*.db'))
-            self.db_files = db_files
+            # Parse to SQLite database in-process, with the same table
+            # detection and serialization as `eparse parse -z`
+            f_name = Path(file_path).name
+            db_file = files_dir / f"{uuid4()}.db"
+            for table, excel_RC, name, sheet in get_df_from_file(file_path):
+                rows = df_serialize_table(table, name=name, sheet=sheet, f_name=f_name)
+                write_database(db_file, rows)
             
-            if not db_files:
+            # The database path is known, so there is no directory to scan;
+            # it only exists if at least one table was written
+            if not db_file.is_file():
                 return {"error": "No database files created"}
             
             # Extract detailed data from database
-            extraction_data = self._extract_detailed_data(db_files[0])
+            extraction_data = self._extract_detailed_data(db_file)
+            if "error" in extraction_data:
+                return extraction_data
             
             return {
                 "success": True,
                 "data": extraction_data,
-                "db_file": str(db_files[0]),
                 "message": "Data extracted successfully"
             }
             
-        except subprocess.CalledProcessError as e:
-            return {"error": f"eparse error: {e.stderr}"}
         except Exception as e:
             return {"error": f"General error: {str(e)}"}
+        finally:
+            # Everything the app shows has been read out of the database,
+            # so it is not kept around until exit
+            shutil.rmtree(files_dir, ignore_errors=True)
     
     def _extract_detailed_data(self, db_file: Path):
         """Extract detailed structured data from SQLite database."""
@@ -73,58 +128,38 @@ class EnhancedExcelExtractor:
             
             data = {
                 "tables": [],
-                "sheets": set(),
-                "columns": set(),
+                "sheets": [],
+                "columns": [],
                 "total_rows": 0,
-                "data_types": set(),
-                "raw_data": [],
-                "sheet_data": {},
-                "column_data": {}
+                "data_types": [],
+                "raw_data_sample": [],
+                "sheet_counts": {},
+                "column_counts": {},
+                "type_counts": {},
+                "unique_value_count": 0
             }
             
-            for table in tables:
-                table_name = table[0]
-                if table_name == "excelparse":
-                    # Get all data from the excelparse table
-                    cursor.execute("SELECT * FROM excelparse")
-                    rows = cursor.fetchall()
-                    
-                    # Get column names
-                    cursor.execute("PRAGMA table_info(excelparse)")
-                    columns = [col[1] for col in cursor.fetchall()]
-                    
-                    data["total_rows"] = len(rows)
-                    
-                    # Process each row
-                    for row in rows:
-                        row_dict = dict(zip(columns, row))
-                        data["raw_data"].append(row_dict)
-                        
-                        # Extract sheet information
-                        if row_dict.get('sheet'):
-                            data["sheets"].add(row_dict['sheet'])
-                            if row_dict['sheet'] not in data["sheet_data"]:
-                                data["sheet_data"][row_dict['sheet']] = []
-                            data["sheet_data"][row_dict['sheet']].append(row_dict)
-                        
-                        # Extract column information
-                        if row_dict.get('c_header'):
-                            data["columns"].add(row_dict['c_header'])
-                            if row_dict['c_header'] not in data["column_data"]:
-                                data["column_data"][row_dict['c_header']] = []
-                            data["column_data"][row_dict['c_header']].append(row_dict)
-                        
-                        # Extract data types
-                        if row_dict.get('type'):
-                            data["data_types"].add(row_dict['type'])
+            if ("excelparse",) in tables:
+                # Distinct values and their counts come straight from SQLite
+                data["sheet_counts"] = _count_by(cursor, "sheet")
+                data["column_counts"] = _count_by(cursor, "c_header")
+                data["type_counts"] = _count_by(cursor, "type")
+                data["sheets"] = list(data["sheet_counts"])
+                data["columns"] = list(data["column_counts"])
+                data["data_types"] = list(data["type_counts"])
+                
+                data["total_rows"] = cursor.execute("SELECT COUNT(*) FROM excelparse").fetchone()[0]
+                
+                # Only the rows the sample table shows are kept as records
+                query = f"SELECT {', '.join(EXCELPARSE_FIELDS)} FROM excelparse LIMIT ?"
+                sample = pd.read_sql_query(query, conn, params=(SAMPLE_ROWS,))
+                data["raw_data_sample"] = sample.to_dict("records")
+                
+                # value is a non-null text column, so SQLite can count distinct ones itself
+                data["unique_value_count"] = cursor.execute("SELECT COUNT(DISTINCT value) FROM excelparse").fetchone()[0]
             
             conn.close()
             
-            # Convert sets to lists for JSON serialization
-            data["sheets"] = list(data["sheets"])
-            data["columns"] = list(data["columns"])
-            data["data_types"] = list(data["data_types"])
-            
             return data
             
         except Exception as e:
@@ -132,6 +167,16 @@ class EnhancedExcelExtractor:
 
 def create_sample_excel():
     """Create a comprehensive sample Excel file for demonstration."""
+    filename = _write_sample_excel()
+    if not os.path.exists(filename):
+        # The cached file was removed from the temp directory; write it again
+        _write_sample_excel.cache_clear()
+        filename = _write_sample_excel()
+    return filename
+
+@functools.lru_cache(maxsize=1)
+def _write_sample_excel() -> str:
+    """Write the sample workbook once and return its path."""
     # Employee data
     employee_data = {
         'Name': ['Alice Johnson', 'Bob Smith', 'Charlie Brown', 'Diana Prince', 'Eve Wilson', 'Frank Miller'],
@@ -161,14 +206,32 @@ def create_sample_excel():
         'Growth_Rate': [0.05, 0.10, 0.09, 0.08, 0.08, 0.07]
     }
     
-    filename = "enhanced_sample_data.xlsx"
+    sheets = {'Employees': employee_data, 'Sales': sales_data, 'Financial': financial_data}
     
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        pd.DataFrame(employee_data).to_excel(writer, sheet_name='Employees', index=False)
-        pd.DataFrame(sales_data).to_excel(writer, sheet_name='Sales', index=False)
-        pd.DataFrame(financial_data).to_excel(writer, sheet_name='Financial', index=False)
+    # Cache the file on disk, keyed by a hash of its contents
+    version = hashlib.sha256(json.dumps(sheets, sort_keys=True).encode()).hexdigest()[:12]
+    filename = Path(tempfile.gettempdir()) / f"enhanced_sample_{version}" / "enhanced_sample_data.xlsx"
+    if filename.exists():
+        return str(filename)
     
-    return filename
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    partial = filename.with_name(f".{uuid4().hex}.xlsx")
+    
+    # Rows are written in order straight from the column lists, which lets
+    # xlsxwriter stream each row to disk instead of building DataFrames
+    with xlsxwriter.Workbook(str(partial), {'constant_memory': True}) as workbook:
+        for sheet_name, sheet_data in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, list(sheet_data))
+            for row_num, row in enumerate(zip(*sheet_data.values()), start=1):
+                worksheet.write_row(row_num, 0, row)
+    
+    # Publish atomically so concurrent clicks never serve a half-written file
+    os.replace(partial, filename)
+    return str(filename)
+
+# Shared by every request so repeat uploads hit its cache
+_EXTRACTOR = EnhancedExcelExtractor()
 
 def process_excel_file_enhanced(file):
     """Process uploaded Excel file and return enhanced extracted data."""
@@ -176,11 +239,8 @@ def process_excel_file_enhanced(file):
         return "Please upload an Excel file.", None, None, None, None, None, None
     
     try:
-        # Initialize enhanced extractor
-        extractor = EnhancedExcelExtractor()
-        
         # Extract data
-        result = extractor.extract_from_excel(file.name)
+        result = _EXTRACTOR.extract_from_excel(file.name)
         
         if "error" in result:
             return f"Error: {result['error']}", None, None, None, None, None, None
@@ -196,136 +256,196 @@ def process_excel_file_enhanced(file):
     except Exception as e:
         return f"Error processing file: {str(e)}", None, None, None, None, None, None
 
-def create_enhanced_visualizations(data: Dict[str, Any]):
-    """Create enhanced visualizations from extracted data."""
-    charts = []
+# Wide workbooks can yield hundreds of sheets, columns or types; past this
+# many bars (or pie slices) the smallest ones are folded into "Other"
+MAX_BARS = 30
+
+def _top_k_with_other(names: np.ndarray, counts: np.ndarray, k: int = MAX_BARS) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k largest counts and sum the rest into an "Other" entry."""
+    if len(names) <= k:
+        return names, counts
     
-    try:
-        # Chart 1: Data Overview Gauge
-        fig1 = go.Figure()
-        fig1.add_trace(go.Indicator(
-            mode="gauge+number+delta",
-            value=data.get("total_rows", 0),
-            title={'text': "Total Data Points"},
-            gauge={
-                'axis': {'range': [None, max(data.get("total_rows", 0) * 1.2, 1)]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, data.get("total_rows", 0) * 0.3], 'color': "lightgray"},
-                    {'range': [data.get("total_rows", 0) * 0.3, data.get("total_rows", 0) * 0.7], 'color': "yellow"},
-                    {'range': [data.get("total_rows", 0) * 0.7, data.get("total_rows", 0)], 'color': "green"}
-                ]
-            }
+    order = np.argsort(-counts, kind='stable')
+    top, tail = order[:k], order[k:]
+    names = np.append(names[top], f"Other ({len(tail)})").astype(object)
+    counts = np.append(counts[top], counts[tail].sum()).astype(np.int32)
+    return names, counts
+
+def _chart_counts(counts: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Turn precomputed per-key counts into the name/count arrays a chart plots."""
+    # NumPy arrays let Plotly ship typed arrays to the browser; int32 is
+    # sent as-is while int64 has to be converted first
+    names = np.asarray(list(counts), dtype=object)
+    values = np.fromiter(counts.values(), dtype=np.int32, count=len(counts))
+    return _top_k_with_other(names, values)
+
+# Plotly takes most of this module's import time and is only needed once
+# there is something to chart, so it is loaded on first use
+@functools.lru_cache(maxsize=1)
+def _plotly():
+    """Import Plotly on first use and return (plotly.express, plotly.graph_objects)."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    # Serialize figures with orjson's C encoder, which also encodes NumPy arrays natively
+    pio.json.config.default_engine = "orjson"
+    return px, go
+
+def _empty_chart(title: str, text: str = "No data available", height: int = 300):
+    """Blank figure with a centered message, used when a chart has nothing to plot."""
+    _, go = _plotly()
+    fig = go.Figure()
+    fig.add_annotation(text=text, xref="paper", yref="paper", x=0.5, y=0.5)
+    fig.update_layout(title=title, height=height)
+    return fig
+
+def _build_chart1(data: Dict[str, Any]):
+    """Chart 1: Data Overview Gauge."""
+    _, go = _plotly()
+    total = int(data.get("total_rows", 0) or 0)
+    if total == 0:
+        # An all-zero gauge only draws zero-width steps
+        return _empty_chart("Data Overview")
+    
+    low, high = total * 0.3, total * 0.7
+    fig1 = go.Figure()
+    fig1.add_trace(go.Indicator(
+        mode="gauge+number+delta",
+        value=total,
+        title={'text': "Total Data Points"},
+        gauge={
+            'axis': {'range': [None, total * 1.2]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, low], 'color': "lightgray"},
+                {'range': [low, high], 'color': "yellow"},
+                {'range': [high, total], 'color': "green"}
+            ]
+        }
+    ))
+    fig1.update_layout(title="Data Overview", height=300)
+    return fig1
+
+def _build_chart2(data: Dict[str, Any]):
+    """Chart 2: Sheets Distribution."""
+    px, _ = _plotly()
+    if data.get("sheets"):
+        sheet_names, sheet_counts = _chart_counts(data["sheet_counts"])
+        fig2 = px.bar(
+            x=sheet_names,
+            y=sheet_counts,
+            title="Data Points per Sheet",
+            labels={'x': 'Sheet Name', 'y': 'Number of Data Points'},
+            color=sheet_counts,
+            color_continuous_scale='viridis'
+        )
+        fig2.update_layout(height=300)
+    else:
+        fig2 = _empty_chart("Sheets Distribution", "No sheet data available")
+    return fig2
+
+def _build_chart3(data: Dict[str, Any]):
+    """Chart 3: Columns Distribution."""
+    _, go = _plotly()
+    if data.get("columns"):
+        column_names, column_counts = _chart_counts(data["column_counts"])
+        fig3 = go.Figure(go.Bar(
+            x=column_names,
+            y=column_counts,
+            marker=dict(color=column_counts, colorscale='Plasma', showscale=True)
         ))
-        fig1.update_layout(title="Data Overview", height=300)
-        charts.append(fig1)
-        
-        # Chart 2: Sheets Distribution
-        if data.get("sheets"):
-            sheet_counts = [len(data["sheet_data"].get(sheet, [])) for sheet in data["sheets"]]
-            fig2 = px.bar(
-                x=data["sheets"],
-                y=sheet_counts,
-                title="Data Points per Sheet",
-                labels={'x': 'Sheet Name', 'y': 'Number of Data Points'},
-                color=sheet_counts,
-                color_continuous_scale='viridis'
-            )
-            fig2.update_layout(height=300)
-        else:
-            fig2 = go.Figure()
-            fig2.add_annotation(text="No sheet data available", xref="paper", yref="paper", x=0.5, y=0.5)
-            fig2.update_layout(title="Sheets Distribution", height=300)
-        charts.append(fig2)
-        
-        # Chart 3: Columns Distribution
-        if data.get("columns"):
-            column_counts = [len(data["column_data"].get(col, [])) for col in data["columns"]]
-            fig3 = px.bar(
-                x=data["columns"],
-                y=column_counts,
-                title="Data Points per Column",
-                labels={'x': 'Column Name', 'y': 'Number of Data Points'},
-                color=column_counts,
-                color_continuous_scale='plasma'
-            )
-            fig3.update_layout(height=300)
-        else:
-            fig3 = go.Figure()
-            fig3.add_annotation(text="No column data available", xref="paper", yref="paper", x=0.5, y=0.5)
-            fig3.update_layout(title="Columns Distribution", height=300)
-        charts.append(fig3)
-        
-        # Chart 4: Data Types Distribution
-        if data.get("data_types"):
-            type_counts = {}
-            for data_type in data["data_types"]:
-                type_counts[data_type] = sum(1 for row in data["raw_data"] if row.get('type') == data_type)
-            
-            fig4 = px.pie(
-                values=list(type_counts.values()),
-                names=list(type_counts.keys()),
-                title="Data Types Distribution"
-            )
-            fig4.update_layout(height=300)
-        else:
-            fig4 = go.Figure()
-            fig4.add_annotation(text="No data type information available", xref="paper", yref="paper", x=0.5, y=0.5)
-            fig4.update_layout(title="Data Types Distribution", height=300)
-        charts.append(fig4)
-        
-        # Chart 5: Sample Data Table
-        if data.get("raw_data"):
-            # Create a sample table from the first few rows
-            sample_data = data["raw_data"][:10]
-            if sample_data:
-                headers = list(sample_data[0].keys())
-                values = [[row.get(h, '') for h in headers] for row in sample_data]
-                
-                fig5 = go.Figure(data=[go.Table(
-                    header=dict(values=headers, fill_color='paleturquoise', align='left'),
-                    cells=dict(values=list(zip(*values)), fill_color='lavender', align='left'))
-                ])
-                fig5.update_layout(title="Sample Extracted Data (First 10 Rows)", height=400)
-            else:
-                fig5 = go.Figure()
-                fig5.add_annotation(text="No data available", xref="paper", yref="paper", x=0.5, y=0.5)
-                fig5.update_layout(title="Sample Data", height=400)
-        else:
-            fig5 = go.Figure()
-            fig5.add_annotation(text="No data available", xref="paper", yref="paper", x=0.5, y=0.5)
-            fig5.update_layout(title="Sample Data", height=400)
-        charts.append(fig5)
-        
-        # Chart 6: Data Summary Table
-        summary_data = [
-            ["Total Rows", data.get("total_rows", 0)],
-            ["Sheets", len(data.get("sheets", []))],
-            ["Columns", len(data.get("columns", []))],
-            ["Data Types", len(data.get("data_types", []))],
-            ["Unique Values", len(set(str(row.get('value', '')) for row in data.get("raw_data", [])))]
-        ]
+        fig3.update_layout(
+            title="Data Points per Column",
+            xaxis_title="Column Name",
+            yaxis_title="Number of Data Points",
+            height=300
+        )
+    else:
+        fig3 = _empty_chart("Columns Distribution", "No column data available")
+    return fig3
+
+def _build_chart4(data: Dict[str, Any]):
+    """Chart 4: Data Types Distribution."""
+    px, _ = _plotly()
+    if data.get("data_types"):
+        type_names, type_counts = _chart_counts(data["type_counts"])
         
-        fig6 = go.Figure(data=[go.Table(
-            header=dict(values=["Metric", "Value"], fill_color='lightblue', align='left'),
-            cells=dict(values=list(zip(*summary_data)), fill_color='lightcyan', align='left'))
+        fig4 = px.pie(
+            values=type_counts,
+            names=type_names,
+            title="Data Types Distribution"
+        )
+        fig4.update_layout(height=300)
+    else:
+        fig4 = _empty_chart("Data Types Distribution", "No data type information available")
+    return fig4
+
+def _build_chart5(data: Dict[str, Any]):
+    """Chart 5: Sample Data Table."""
+    _, go = _plotly()
+    # Extraction keeps only the first few rows for this table
+    sample_data = data.get("raw_data_sample")
+    if sample_data:
+        headers = list(sample_data[0].keys())
+        # go.Table takes cell values column by column
+        cells = [[row.get(h, '') for row in sample_data] for h in headers]
+
+        fig5 = go.Figure(data=[go.Table(
+            header=dict(values=headers, fill_color='paleturquoise', align='left'),
+            cells=dict(values=cells, fill_color='lavender', align='left'))
         ])
-        fig6.update_layout(title="Data Summary", height=300)
-        charts.append(fig6)
-        
+        fig5.update_layout(title=f"Sample Extracted Data (First {SAMPLE_ROWS} Rows)", height=400)
+    else:
+        fig5 = _empty_chart("Sample Data", height=400)
+    return fig5
+
+def _build_chart6(data: Dict[str, Any]):
+    """Chart 6: Data Summary Table."""
+    _, go = _plotly()
+    summary_data = [
+        ["Total Rows", data.get("total_rows", 0)],
+        ["Sheets", len(data.get("sheets", []))],
+        ["Columns", len(data.get("columns", []))],
+        ["Data Types", len(data.get("data_types", []))],
+        ["Unique Values", data.get("unique_value_count", 0)]
+    ]
+
+    metrics, values = zip(*summary_data)
+
+    fig6 = go.Figure(data=[go.Table(
+        header=dict(values=["Metric", "Value"], fill_color='lightblue', align='left'),
+        cells=dict(values=[list(metrics), np.array(values, dtype=np.int32)], fill_color='lightcyan', align='left'))
+    ])
+    fig6.update_layout(title="Data Summary", height=300)
+    return fig6
+
+CHART_BUILDERS = (_build_chart1, _build_chart2, _build_chart3, _build_chart4, _build_chart5, _build_chart6)
+
+def _build_chart_safely(index: int, data: Dict[str, Any]):
+    """Build one chart, or an error placeholder if that chart fails."""
+    try:
+        fig = CHART_BUILDERS[index](data)
     except Exception as e:
-        # Create empty charts if visualization fails
-        for i in range(6):
-            fig = go.Figure()
-            fig.add_annotation(text=f"Chart {i+1}: Error creating visualization - {str(e)}", xref="paper", yref="paper", x=0.5, y=0.5)
-            fig.update_layout(title=f"Chart {i+1}", height=300)
-            charts.append(fig)
-    
-    return charts
+        fig = _empty_chart(f"Chart {index+1}", f"Chart {index+1}: Error creating visualization - {str(e)}")
+    return fig
+
+def create_enhanced_visualizations(data: Dict[str, Any]):
+    """Create enhanced visualizations from extracted data."""
+    # The charts only read `data`, so they can be built concurrently;
+    # map() keeps them in display order. A failing chart no longer
+    # blanks the other five.
+    with ThreadPoolExecutor(max_workers=len(CHART_BUILDERS)) as pool:
+        return list(pool.map(lambda index: _build_chart_safely(index, data), range(len(CHART_BUILDERS))))
 
 def format_enhanced_summary(data: Dict[str, Any]):
     """Format extracted data into an enhanced readable summary."""
-    summary = f"""
+    sheet_counts = data.get('sheet_counts', {})
+    column_counts = data.get('column_counts', {})
+    
+    # Written line by line so wide workbooks don't build a list of lines
+    # and then a joined copy for every section
+    buf = io.StringIO()
+    buf.write(f"""
 ## 📊 Enhanced Excel Data Extraction Summary
 
 ### 🔢 Data Overview
@@ -333,17 +453,22 @@ def format_enhanced_summary(data: Dict[str, Any]):
 - **Number of Sheets**: {len(data.get('sheets', []))}
 - **Number of Columns**: {len(data.get('columns', []))}
 - **Data Types Found**: {len(data.get('data_types', []))}
-- **Unique Values**: {len(set(str(row.get('value', '')) for row in data.get('raw_data', []))):,}
+- **Unique Values**: {data.get('unique_value_count', 0):,}
 
 ### 📋 Sheets Found
-{chr(10).join([f"- **{sheet}**: {len(data.get('sheet_data', {}).get(sheet, []))} data points" for sheet in data.get('sheets', [])])}
-
-### 🏷️ Columns Identified
-{chr(10).join([f"- **{col}**: {len(data.get('column_data', {}).get(col, []))} data points" for col in data.get('columns', [])])}
-
-### 📊 Data Types
-{chr(10).join([f"- {dtype}" for dtype in data.get('data_types', [])])}
-
+""")
+    for sheet in data.get('sheets', []):
+        buf.write(f"- **{sheet}**: {sheet_counts.get(sheet, 0)} data points\n")
+    
+    buf.write("\n### 🏷️ Columns Identified\n")
+    for col in data.get('columns', []):
+        buf.write(f"- **{col}**: {column_counts.get(col, 0)} data points\n")
+    
+    buf.write("\n### 📊 Data Types\n")
+    for dtype in data.get('data_types', []):
+        buf.write(f"- {dtype}\n")
+    
+    buf.write("""
 ### 🔍 Extraction Details
 The data has been successfully extracted and chunked using **eparse**. Each data point maintains:
 - **Row/Column Position**: Exact location in the original Excel file
@@ -364,8 +489,8 @@ The data has been successfully extracted and chunked using **eparse**. Each data
 - Export specific data subsets for further analysis
 - Query the extracted data using the database interface
 - Integrate with LLM tools for advanced data analysis
-"""
-    return summary
+""")
+    return buf.getvalue()
 
 def download_enhanced_sample():
     """Create and return an enhanced sample Excel file for download."""
@@ -375,6 +500,8 @@ def download_enhanced_sample():
 # Create Enhanced Gradio interface
 def create_enhanced_interface():
     """Create the enhanced Gradio interface."""
+    # Write the sample workbook at startup so the first download is a cache hit
+    create_sample_excel()
     
     with gr.Blocks(title="Enhanced Excel Data Extraction & Visualization", theme=gr.themes.Soft()) as demo:
         gr.Markdown("# 🚀 Enhanced Excel Data Extraction & Visualization Tool")